@@ -1,31 +1,37 @@
+import asyncio
 from typing import Dict, Any, Callable, Optional, List
-from .services.nodes import BaseNode
+from .services.nodes import BaseNode, clear_checkpoints
 
 class Flow:
-    def __init__(self, start: BaseNode):
+    def __init__(self, start: BaseNode, enable_history: bool = False):
         """Initialize the flow with a starting node."""
         self.start = start
         self.current_node = start
         self.shared_data = {}
+        # Off by default: retaining every executed node keeps their captured
+        # shared-state references alive for the Flow's lifetime
+        self.enable_history = enable_history
         self.history = []
-        
-    def run(self, params: Dict[str, Any] = None) -> Dict[str, Any]:
-        """Run the flow from start to finish."""
+
+    async def run(self, params: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Run the flow from start to finish without blocking the event loop."""
         if params:
             self.shared_data.update(params)
-            
+
         current = self.start
         result = None
-        
+
         while current:
-            # Store current node in history
-            self.history.append(current)
-            
-            # Prepare node
-            current.prep(self.shared_data)
-            
-            # Execute node
-            prep_result = current._run(self.shared_data)
+            # Store just the node name in history when enabled
+            if self.enable_history:
+                self.history.append(current.__class__.__name__)
+
+            # Nodes read run configuration (repo_url, patterns, ...) from
+            # self.params, so hand each one the accumulated shared state
+            current.set_params(self.shared_data)
+
+            # Execute node (prep happens inside _run)
+            prep_result = await current._run(self.shared_data)
             
             # Get next node based on result
             next_node = None
@@ -43,7 +49,11 @@ class Flow:
             
             # Move to next node
             current = next_node
-            
+
+        # The run finished: its checkpoints have served their purpose, and
+        # keeping them would pin later runs of this config to stale output
+        clear_checkpoints(self.shared_data)
+
         return result
 
     def reset(self):
@@ -89,13 +99,13 @@ if __name__ == "__main__":
     
     try:
         # Run the flow with parameters
-        result = flow.run({
+        result = asyncio.run(flow.run({
             "repo_url": "https://github.com/pydantic/pydantic",
             "language": "english",
             "include_patterns": ["*.py", "*.md"],
             "exclude_patterns": ["*test*.py", "*tests/*"],
             "max_file_size": 1 * 1024 * 1024  # 1 MB
-        })
+        }))
         
         print("\nTutorial generation complete!")
         print(f"Generated tutorial: {result['title']}")
@@ -7,8 +7,8 @@ import os
 from dotenv import load_dotenv
 from datetime import timedelta
 from .services.tutorial_generator import TutorialGenerator
-from .services.github_service import GitHubService
-from .services.llm_service import LLMService
+from .services.github_service import get_github_service
+from .services.llm_service import get_llm_service
 
 load_dotenv()
 
@@ -29,8 +29,8 @@ app.add_middleware(
 
 # Initialize services
 tutorial_generator = TutorialGenerator()
-github_service = GitHubService()
-llm_service = LLMService()
+github_service = get_github_service()
+llm_service = get_llm_service()
 
 # Models
 class TutorialRequest(BaseModel):
@@ -39,6 +39,9 @@ class TutorialRequest(BaseModel):
     include_patterns: Optional[List[str]] = None
     exclude_patterns: Optional[List[str]] = None
     max_file_size: Optional[int] = 100000
+    force_refresh: bool = False
+    # "files" writes the markdown directory, "zip" a single archive
+    output_format: str = "files"
 
 class TutorialResponse(BaseModel):
     status: str
@@ -60,7 +63,9 @@ async def generate_tutorial(request: TutorialRequest):
             language=request.language,
             include_patterns=request.include_patterns,
             exclude_patterns=request.exclude_patterns,
-            max_file_size=request.max_file_size
+            max_file_size=request.max_file_size,
+            force_refresh=request.force_refresh,
+            output_format=request.output_format
         )
 
         return tutorial
@@ -0,0 +1,95 @@
+import ast
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List
+
+def _analyze_one(file: Dict[str, Any]) -> Dict[str, Any]:
+    """Analyze a single file dict; module-level so worker processes can pickle it."""
+    return CodeAnalyzer()._analyze_file(file)
+
+class CodeAnalyzer:
+    """Static analysis over fetched files to identify a codebase's core abstractions."""
+
+    # Below this many files, process spawn cost outweighs the parallel parse
+    _PARALLEL_THRESHOLD = 64
+
+    def analyze_files(self, files: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Analyze a list of file dicts and extract abstractions and relationships."""
+        abstractions = []
+        relationships = []
+
+        if len(files) >= self._PARALLEL_THRESHOLD:
+            # ast.parse is pure CPU, so fan out across cores and reduce the
+            # per-file results back in the main process
+            with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+                per_file = list(executor.map(_analyze_one, files, chunksize=8))
+        else:
+            per_file = map(self._analyze_file, files)
+
+        for result in per_file:
+            abstractions.extend(result["abstractions"])
+            relationships.extend(result["relationships"])
+
+        return {
+            "abstractions": abstractions,
+            "relationships": relationships,
+            "core_components": self._core_components(abstractions, relationships)
+        }
+
+    def _analyze_file(self, file: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract classes, functions, and inheritance edges from one file."""
+        path = file.get("path", "")
+        content = file.get("content", "")
+        abstractions = []
+        relationships = []
+
+        if not path.endswith(".py") or not content:
+            return {"abstractions": abstractions, "relationships": relationships}
+
+        try:
+            tree = ast.parse(content)
+        except SyntaxError:
+            return {"abstractions": abstractions, "relationships": relationships}
+
+        for node in tree.body:
+            if isinstance(node, ast.ClassDef):
+                abstractions.append({
+                    "name": node.name,
+                    "description": ast.get_docstring(node) or "",
+                    "type": "class",
+                    "file": path
+                })
+                for base in node.bases:
+                    if isinstance(base, ast.Name):
+                        relationships.append({
+                            "from": node.name,
+                            "to": base.id,
+                            "label": "inherits from"
+                        })
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                abstractions.append({
+                    "name": node.name,
+                    "description": ast.get_docstring(node) or "",
+                    "type": "function",
+                    "file": path
+                })
+
+        return {"abstractions": abstractions, "relationships": relationships}
+
+    def _core_components(self, abstractions: list, relationships: list) -> list:
+        """Rank abstractions by how often relationships reference them."""
+        references = {}
+        for rel in relationships:
+            references[rel["to"]] = references.get(rel["to"], 0) + 1
+        ranked = sorted(
+            abstractions,
+            key=lambda a: references.get(a["name"], 0),
+            reverse=True
+        )
+        return [a["name"] for a in ranked[:10]]
+
+@lru_cache(maxsize=1)
+def get_code_analyzer() -> CodeAnalyzer:
+    """Shared CodeAnalyzer instance."""
+    return CodeAnalyzer()
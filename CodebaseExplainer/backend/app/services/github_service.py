@@ -1,73 +1,93 @@
 import os
-from github import Github
+import asyncio
+import threading
 from typing import Optional, List
 from dotenv import load_dotenv
-import requests
+import httpx
 import base64
+import json
 import time
 from typing import Dict, Any, List, Optional, Set, Union
 from urllib.parse import urlparse
+from functools import lru_cache
 import fnmatch
+import re
 
 load_dotenv()
 
+@lru_cache(maxsize=128)
+def _parse_repo_url(url: str) -> tuple:
+    """Split a GitHub URL into its path parts, memoized per URL."""
+    parsed_url = urlparse(url)
+    path_parts = tuple(parsed_url.path.strip('/').split('/'))
+    if len(path_parts) < 2:
+        raise ValueError(f"Invalid GitHub URL: {url}")
+    return path_parts
+
+class _CachedResponse:
+    """Stand-in response returned on 304 Not Modified, replaying the cached body."""
+    def __init__(self, text, headers):
+        self.status_code = 200
+        self.text = text
+        self.headers = headers
+
+    def json(self):
+        return json.loads(self.text)
+
 class GitHubService:
     def __init__(self):
         self.token = os.getenv("GITHUB_TOKEN")
-        self.client = Github(self.token)
         self.headers = {"Accept": "application/vnd.github.v3+json"}
         if self.token:
             self.headers["Authorization"] = f"token {self.token}"
+        # One pooled HTTP/2 client: handshakes are paid once, concurrent calls
+        # multiplex over the same connection
+        self.http = httpx.Client(
+            http2=True,
+            headers=self.headers,
+            timeout=30.0,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=32)
+        )
+        # url -> (etag, body text, headers); 304 replays don't count against the rate limit
+        self._etag: Dict[str, tuple] = {}
+        # Blob downloads run on one private event loop for the service's
+        # lifetime, so the async HTTP/2 pool survives across fetches instead
+        # of re-handshaking on every fetch_repository call
+        self._crawl_loop = asyncio.new_event_loop()
+        threading.Thread(target=self._crawl_loop.run_forever, daemon=True).start()
+        self._async_client: Optional[httpx.AsyncClient] = None
 
-    def validate_repo(self, repo_url: str) -> bool:
-        """Validate if the repository URL is valid and accessible."""
-        try:
-            repo = self._get_repo_from_url(repo_url)
-            return True
-        except Exception:
-            return False
-
-    def fetch_repository(self, repo_url: str):
-        """Fetch repository information and contents."""
-        repo = self._get_repo_from_url(repo_url)
-        return {
-            "name": repo.name,
-            "description": repo.description,
-            "language": repo.language,
-            "created_at": repo.created_at.isoformat(),
-            "files": self._fetch_files(repo)
-        }
-
-    def _get_repo_from_url(self, url: str):
-        """Extract repository information from URL and get repository object."""
-        parts = url.strip("/").split("/")[-2:]
-        if len(parts) != 2:
-            raise ValueError("Invalid repository URL format")
-        
-        owner, repo_name = parts
-        return self.client.get_repo(f"{owner}/{repo_name}")
+    def _blob_client(self) -> httpx.AsyncClient:
+        """Long-lived async client for blob downloads; only touched on the crawl loop."""
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                http2=True,
+                headers=self.headers,
+                timeout=30.0,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=32)
+            )
+        return self._async_client
 
-    def _fetch_files(self, repo, path=""):
-        """Recursively fetch files from repository."""
-        contents = repo.get_contents(path)
-        files = []
-        
-        for content in contents:
-            if content.type == "dir":
-                files.extend(self._fetch_files(repo, content.path))
-            else:
-                files.append({
-                    "path": content.path,
-                    "size": content.size,
-                    "type": content.type
-                })
-        
-        return files
+    def _get(self, url: str, params=None):
+        """GET with an If-None-Match header so unchanged responses cost no rate limit."""
+        cached = self._etag.get(url)
+        extra_headers = {"If-None-Match": cached[0]} if cached else None
+
+        response = self.http.get(url, params=params, headers=extra_headers)
+
+        if response.status_code == 304 and cached:
+            return _CachedResponse(cached[1], cached[2])
+
+        etag = response.headers.get("ETag")
+        if etag and response.status_code == 200:
+            self._etag[url] = (etag, response.text, response.headers)
+
+        return response
 
     def fetch_branches(self, owner: str, repo: str) -> List[Dict[str, Any]]:
         """Get branches of the repository"""
         url = f"https://api.github.com/repos/{owner}/{repo}/branches"
-        response = requests.get(url, headers=self.headers)
+        response = self._get(url)
 
         if response.status_code == 404:
             if not self.token:
@@ -85,20 +105,15 @@ class GitHubService:
     def validate_repo(self, repo_url: str) -> bool:
         """Validate if a GitHub repository URL is valid."""
         try:
-            # Parse URL to extract owner and repo
-            parsed_url = urlparse(repo_url)
-            path_parts = parsed_url.path.strip('/').split('/')
-            
-            if len(path_parts) < 2:
+            try:
+                owner, repo = _parse_repo_url(repo_url)[:2]
+            except ValueError:
                 return False
-                
-            owner = path_parts[0]
-            repo = path_parts[1]
-            
-            # Try to get repository info
+
+            # A HEAD request is enough to check existence/permissions
             url = f"https://api.github.com/repos/{owner}/{repo}"
-            response = requests.get(url, headers=self.headers)
-            
+            response = self.http.head(url)
+
             if response.status_code == 404:
                 if not self.token:
                     raise Exception(f"Error 404: Repository not found or is private.\n"
@@ -118,12 +133,7 @@ class GitHubService:
         """Fetch repository data and files."""
         try:
             # Parse URL
-            parsed_url = urlparse(repo_url)
-            path_parts = parsed_url.path.strip('/').split('/')
-            
-            if len(path_parts) < 2:
-                raise ValueError(f"Invalid GitHub URL: {repo_url}")
-            
+            path_parts = _parse_repo_url(repo_url)
             owner = path_parts[0]
             repo = path_parts[1]
             
@@ -159,125 +169,102 @@ class GitHubService:
             if exclude_patterns and isinstance(exclude_patterns, str):
                 exclude_patterns = {exclude_patterns}
 
+            # Translate the glob patterns once so each file is one C-level regex match
+            # instead of a fnmatch call per pattern
+            inc_re = re.compile("|".join(fnmatch.translate(p) for p in include_patterns)) if include_patterns else None
+            exc_re = re.compile("|".join(fnmatch.translate(p) for p in exclude_patterns)) if exclude_patterns else None
+
             def should_include_file(file_path: str, file_name: str) -> bool:
                 """Determine if a file should be included based on patterns"""
-                if not include_patterns:
-                    include_file = True
-                else:
-                    include_file = any(fnmatch.fnmatch(file_name, pattern) for pattern in include_patterns)
-
-                if exclude_patterns and include_file:
-                    exclude_file = any(fnmatch.fnmatch(file_path, pattern) for pattern in exclude_patterns)
-                    return not exclude_file
-
-                return include_file
+                if inc_re and not inc_re.match(file_name):
+                    return False
+                if exc_re and exc_re.match(file_path):
+                    return False
+                return True
 
             # Dictionary to store path -> content mapping
             files = {}
             skipped_files = []
-            
-            def fetch_contents(path):
-                """Fetch contents of the repository at a specific path and commit"""
-                url = f"https://api.github.com/repos/{owner}/{repo}/contents/{path}"
-                params = {"ref": ref} if ref is not None else {}
-                
-                response = requests.get(url, headers=self.headers, params=params)
-                
-                if response.status_code == 403 and 'rate limit exceeded' in response.text.lower():
-                    reset_time = int(response.headers.get('X-RateLimit-Reset', 0))
-                    wait_time = max(reset_time - time.time(), 0) + 1
-                    print(f"Rate limit exceeded. Waiting for {wait_time:.0f} seconds...")
-                    time.sleep(wait_time)
-                    return fetch_contents(path)
-                    
-                if response.status_code == 404:
-                    if not self.token:
-                        raise Exception(f"Error 404: Repository not found or is private.")
-                    elif not path and ref == 'main':
-                        raise Exception(f"Error 404: Repository not found. Check if the default branch is not 'main'")
-                    else:
-                        raise Exception(f"Error 404: Path '{path}' not found in repository or insufficient permissions with the provided token.")
-                
-                if response.status_code != 200:
-                    raise Exception(f"Error fetching {path}: {response.status_code} - {response.text}")
-                
-                contents = response.json()
-                
-                # Handle both single file and directory responses
-                if not isinstance(contents, list):
-                    contents = [contents]
-                
-                for item in contents:
-                    item_path = item["path"]
-                    
-                    if item["type"] == "file":
-                        if not should_include_file(item_path, item["name"]):
-                            print(f"Skipping {item_path}: Does not match include/exclude patterns")
-                            continue
-                        
-                        file_size = item.get("size", 0)
-                        if file_size > max_file_size:
-                            skipped_files.append((item_path, file_size))
-                            print(f"Skipping {item_path}: File size ({file_size} bytes) exceeds limit ({max_file_size} bytes)")
-                            continue
-                        
-                        if "download_url" in item and item["download_url"]:
-                            file_url = item["download_url"]
-                            file_response = requests.get(file_url, headers=self.headers)
-                            
-                            content_length = int(file_response.headers.get('content-length', 0))
+
+            # The tree request goes through the ETag cache: an unchanged repo
+            # answers 304, which costs no rate limit and no transfer
+            tree = self._fetch_tree(owner, repo, ref)
+            base_path = specific_path.strip("/")
+
+            to_download = []
+            for entry in tree:
+                if entry.get("type") != "blob":
+                    continue
+
+                item_path = entry["path"]
+                if base_path and not (item_path == base_path or item_path.startswith(base_path + "/")):
+                    continue
+
+                file_name = item_path.rsplit("/", 1)[-1]
+                if not should_include_file(item_path, file_name):
+                    print(f"Skipping {item_path}: Does not match include/exclude patterns")
+                    continue
+
+                file_size = entry.get("size", 0)
+                if file_size > max_file_size:
+                    skipped_files.append((item_path, file_size))
+                    print(f"Skipping {item_path}: File size ({file_size} bytes) exceeds limit ({max_file_size} bytes)")
+                    continue
+
+                to_download.append(entry)
+
+            async def crawl():
+                """Download the selected blobs concurrently over the pooled client."""
+                semaphore = asyncio.Semaphore(16)
+                client = self._blob_client()
+
+                async def fetch_blob(entry):
+                    """Download a single file straight from raw.githubusercontent.com."""
+                    item_path = entry["path"]
+                    file_size = entry.get("size", 0)
+
+                    raw_url = f"https://raw.githubusercontent.com/{owner}/{repo}/{ref or 'HEAD'}/{item_path}"
+                    # Stream so the size check happens on the headers,
+                    # before any body bytes are transferred
+                    async with semaphore:
+                        async with client.stream("GET", raw_url) as response:
+                            if response.status_code != 200:
+                                print(f"Failed to download {item_path}: {response.status_code}")
+                                return
+
+                            content_length = int(response.headers.get('content-length', 0))
                             if content_length > max_file_size:
                                 skipped_files.append((item_path, content_length))
                                 print(f"Skipping {item_path}: Content length ({content_length} bytes) exceeds limit ({max_file_size} bytes)")
-                                continue
-                                
-                            if file_response.status_code == 200:
-                                files[item_path] = {
-                                    "content": file_response.text,
-                                    "size": file_size,
-                                    "path": item_path
-                                }
-                                print(f"Downloaded: {item_path} ({file_size} bytes) ")
-                            else:
-                                print(f"Failed to download {item_path}: {file_response.status_code}")
-                        else:
-                            content_response = requests.get(item["url"], headers=self.headers)
-                            if content_response.status_code == 200:
-                                content_data = content_response.json()
-                                if content_data.get("encoding") == "base64" and "content" in content_data:
-                                    if len(content_data["content"]) * 0.75 > max_file_size:
-                                        estimated_size = int(len(content_data["content"]) * 0.75)
-                                        skipped_files.append((item_path, estimated_size))
-                                        print(f"Skipping {item_path}: Encoded content exceeds size limit")
-                                        continue
-                                        
-                                    file_content = base64.b64decode(content_data["content"]).decode('utf-8')
-                                    files[item_path] = {
-                                        "content": file_content,
-                                        "size": file_size,
-                                        "path": item_path
-                                    }
-                                    print(f"Downloaded: {item_path} ({file_size} bytes)")
-                                else:
-                                    print(f"Unexpected content format for {item_path}")
-                            else:
-                                print(f"Failed to get content for {item_path}: {content_response.status_code}")
-                    
-                    elif item["type"] == "dir":
-                        fetch_contents(item_path)
-            
-            # Start crawling from the specified path
-            fetch_contents(specific_path)
+                                return
+
+                            await response.aread()
+                            content = response.text
+
+                    files[item_path] = {
+                        "content": content,
+                        "size": file_size,
+                        "path": item_path
+                    }
+                    print(f"Downloaded: {item_path} ({file_size} bytes)")
+
+                await asyncio.gather(*(fetch_blob(e) for e in to_download))
+
+            # Run the download batch on the service's crawl loop, where the
+            # long-lived client and its connections stay valid across calls
+            if to_download:
+                asyncio.run_coroutine_threadsafe(crawl(), self._crawl_loop).result()
             
             return {
+                "name": repo,
                 "files": list(files.values()),
                 "stats": {
                     "downloaded_count": len(files),
                     "skipped_count": len(skipped_files),
                     "skipped_files": skipped_files,
                     "base_path": specific_path,
-                    "include_patterns": include_patterns,
-                    "exclude_patterns": exclude_patterns
+                    "include_patterns": sorted(include_patterns) if include_patterns else None,
+                    "exclude_patterns": sorted(exclude_patterns) if exclude_patterns else None
                 },
                 "metadata": {
                     "owner": owner,
@@ -290,28 +277,49 @@ class GitHubService:
         except Exception as e:
             raise Exception(f"Failed to fetch repository: {str(e)}")
 
+    def _fetch_tree(self, owner: str, repo: str, ref: Optional[str]) -> list:
+        """Fetch the full repository tree in a single conditional request."""
+        tree_url = f"https://api.github.com/repos/{owner}/{repo}/git/trees/{ref or 'HEAD'}?recursive=1"
+
+        while True:
+            response = self._get(tree_url)
+
+            if response.status_code == 403 and 'rate limit exceeded' in response.text.lower():
+                reset_time = int(response.headers.get('X-RateLimit-Reset', 0))
+                wait_time = max(reset_time - time.time(), 0) + 1
+                print(f"Rate limit exceeded. Waiting for {wait_time:.0f} seconds...")
+                time.sleep(wait_time)
+                continue
+
+            if response.status_code == 404:
+                if not self.token:
+                    raise Exception(f"Error 404: Repository not found or is private.")
+                else:
+                    raise Exception(f"Error 404: Ref '{ref or 'HEAD'}' not found in repository or insufficient permissions with the provided token.")
+
+            if response.status_code != 200:
+                raise Exception(f"Error fetching tree: {response.status_code} - {response.text}")
+
+            data = response.json()
+            if data.get("truncated"):
+                print("Warning: tree listing truncated by GitHub; some files may be missing")
+            return data.get("tree", [])
+
     def check_tree(self, owner: str, repo: str, tree: str) -> bool:
         """Check if the repository has the given tree"""
         url = f"https://api.github.com/repos/{owner}/{repo}/git/trees/{tree}"
-        response = requests.get(url, headers=self.headers)
+        response = self._get(url)
         return response.status_code == 200
 
     def get_file_content(self, repo_url: str, file_path: str) -> str:
         """Get content of a specific file in the repository"""
         try:
             # Parse URL
-            parsed_url = urlparse(repo_url)
-            path_parts = parsed_url.path.strip('/').split('/')
-            
-            if len(path_parts) < 2:
-                raise ValueError(f"Invalid GitHub URL: {repo_url}")
-            
-            owner = path_parts[0]
-            repo = path_parts[1]
+            owner, repo = _parse_repo_url(repo_url)[:2]
             
             # Get file content
             url = f"https://api.github.com/repos/{owner}/{repo}/contents/{file_path}"
-            response = requests.get(url, headers=self.headers)
+            response = self._get(url)
             
             if response.status_code == 404:
                 raise Exception(f"File not found: {file_path}")
@@ -364,3 +372,8 @@ if __name__ == "__main__":
             
     except Exception as e:
         print(f"Error: {str(e)}")
+
+@lru_cache(maxsize=1)
+def get_github_service() -> GitHubService:
+    """Shared GitHubService instance, so the HTTP pool and caches are reused."""
+    return GitHubService()
@@ -0,0 +1,87 @@
+import atexit
+import hashlib
+import json
+import logging
+import sqlite3
+from typing import Optional
+
+logger = logging.getLogger("llm_logger")
+
+# Deterministic prompt -> response cache shared by every LLM-invoking node.
+# Backed by SQLite (WAL mode) so lookups are one indexed query and repeat
+# runs / Node retries never re-spend tokens on a call that already succeeded.
+cache_file = "llm_cache.sqlite"
+
+_db: Optional[sqlite3.Connection] = None
+# Batch commits so cache maintenance stays off the per-call path; WAL keeps
+# uncommitted rows readable within the process
+_COMMIT_EVERY = 16
+_pending_writes = 0
+
+# Observability counters
+hits = 0
+misses = 0
+
+def make_key(prompt: str, model: Optional[str] = None, temperature: Optional[float] = None) -> bytes:
+    """Build a deterministic key covering everything that affects the response."""
+    payload = json.dumps(
+        {"prompt": prompt, "model": model, "temp": temperature},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode('utf-8')).digest()
+
+def _get_db() -> sqlite3.Connection:
+    """Open the cache database once per process."""
+    global _db
+    if _db is None:
+        _db = sqlite3.connect(cache_file, check_same_thread=False)
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.execute("PRAGMA synchronous=NORMAL")
+        _db.execute("CREATE TABLE IF NOT EXISTS cache (k BLOB PRIMARY KEY, v BLOB)")
+        _db.commit()
+    return _db
+
+def get(key: bytes) -> Optional[str]:
+    global hits, misses
+    try:
+        row = _get_db().execute(
+            "SELECT v FROM cache WHERE k=?", (key,)
+        ).fetchone()
+    except Exception as e:
+        logger.warning("Failed to read cache: %s", e)
+        misses += 1
+        return None
+    if row:
+        hits += 1
+        return row[0].decode('utf-8')
+    misses += 1
+    return None
+
+def set(key: bytes, value: str):
+    global _pending_writes
+    try:
+        db = _get_db()
+        db.execute(
+            "INSERT OR REPLACE INTO cache(k, v) VALUES(?, ?)",
+            (key, value.encode('utf-8'))
+        )
+        _pending_writes += 1
+        if _pending_writes >= _COMMIT_EVERY:
+            db.commit()
+            _pending_writes = 0
+    except Exception as e:
+        logger.error("Failed to save cache: %s", e)
+
+def stats() -> dict:
+    """Hit/miss counts for logging or a health endpoint."""
+    return {"hits": hits, "misses": misses}
+
+def _flush_pending():
+    """Commit any buffered cache writes; registered to run at exit."""
+    if _db is not None and _pending_writes:
+        try:
+            _db.commit()
+        except Exception as e:
+            logger.error("Failed to save cache: %s", e)
+
+atexit.register(_flush_pending)
@@ -1,50 +1,63 @@
 import os
+import asyncio
+import atexit
 import logging
-import json
+import logging.handlers
+import queue
+import threading
 from datetime import datetime
+from functools import lru_cache
 from typing import Dict, Any, Optional
-import openai
-from google import genai
-from anthropic import Anthropic
+from . import llm_cache
 
 # Configure logging
 log_directory = os.getenv("LOG_DIR", "logs")
 os.makedirs(log_directory, exist_ok=True)
 log_file = os.path.join(log_directory, f"llm_calls_{datetime.now().strftime('%Y%m%d')}.log")
 
-# Set up logger
+# Set up logger; producers enqueue records in O(1) and a background listener
+# thread does the actual file I/O so generate() never blocks on disk
 logger = logging.getLogger("llm_logger")
 logger.setLevel(logging.INFO)
 logger.propagate = False  # Prevent propagation to root logger
-file_handler = logging.FileHandler(log_file)
+file_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=10 << 20, backupCount=5)
 file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-logger.addHandler(file_handler)
-
-# Simple cache configuration
-cache_file = "llm_cache.json"
+_log_queue = queue.Queue(-1)
+_log_listener = logging.handlers.QueueListener(_log_queue, file_handler)
+_log_listener.start()
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+atexit.register(_log_listener.stop)
 
 class LLMService:
     def __init__(self):
         self.client = None
         self.model = None
+        # prompt digest -> Future; concurrent duplicates await the first call
+        # instead of issuing their own
+        self._inflight: Dict[bytes, asyncio.Future] = {}
         self.setup_client()
 
     def setup_client(self):
         provider = os.getenv("LLM_PROVIDER", "gemini")
-        
+
+        # Import each SDK only inside its branch so unused providers never
+        # pay their (large) import cost at server startup
         if provider == "gemini":
+            from google import genai
             api_key = os.getenv("GEMINI_API_KEY")
             if not api_key:
                 raise ValueError("GEMINI_API_KEY environment variable not set")
             self.client = genai.Client(api_key=api_key)
             self.model = os.getenv("GEMINI_MODEL", "gemini-2.5-pro-exp-03-25")
         elif provider == "anthropic":
+            from anthropic import Anthropic
             api_key = os.getenv("ANTHROPIC_API_KEY")
             if not api_key:
                 raise ValueError("ANTHROPIC_API_KEY environment variable not set")
             self.client = Anthropic(api_key=api_key)
             self.model = "claude-3-7-sonnet-20250219"
         elif provider == "openai":
+            import openai
             api_key = os.getenv("OPENAI_API_KEY")
             if not api_key:
                 raise ValueError("OPENAI_API_KEY environment variable not set")
@@ -53,94 +66,127 @@ class LLMService:
         else:
             raise ValueError(f"Unsupported LLM provider: {provider}")
 
+    def _provider_chunks(self, prompt: str):
+        """Synchronous generator over the provider's streaming API."""
+        provider = os.getenv("LLM_PROVIDER", "gemini")
+
+        if provider == "gemini":
+            for chunk in self.client.models.generate_content_stream(
+                model=self.model,
+                contents=[prompt]
+            ):
+                if chunk.text:
+                    yield chunk.text
+        elif provider == "anthropic":
+            with self.client.messages.stream(
+                model=self.model,
+                max_tokens=21000,
+                thinking={
+                    "type": "enabled",
+                    "budget_tokens": 20000
+                },
+                messages=[
+                    {"role": "user", "content": prompt}
+                ]
+            ) as stream:
+                yield from stream.text_stream
+        elif provider == "openai":
+            response = self.client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                stream=True,
+                temperature=0.7,
+                max_tokens=2000
+            )
+            for chunk in response:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        else:
+            raise ValueError(f"Unsupported LLM provider: {provider}")
+
+    async def stream(self, prompt: str, use_cache: bool = True):
+        """Stream text from the configured LLM, yielding chunks as they arrive."""
+        # Log the prompt
+        logger.info("PROMPT: %s", prompt)
+
+        # Check cache if enabled
+        if use_cache:
+            cached = llm_cache.get(llm_cache.make_key(prompt, self.model))
+            if cached is not None:
+                logger.info("CACHE HIT - RESPONSE: %s", cached)
+                yield cached
+                return
+
+        # The provider SDK streams are synchronous; iterating them inline
+        # would block the event loop for the whole generation and serialize
+        # every concurrent call. Drain them in a worker thread feeding a
+        # queue so the loop stays free to interleave other streams.
+        loop = asyncio.get_running_loop()
+        chunk_queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        def produce():
+            try:
+                for chunk in self._provider_chunks(prompt):
+                    loop.call_soon_threadsafe(chunk_queue.put_nowait, chunk)
+                loop.call_soon_threadsafe(chunk_queue.put_nowait, done)
+            except BaseException as e:
+                loop.call_soon_threadsafe(chunk_queue.put_nowait, e)
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+
+        chunks = []
+        try:
+            while True:
+                item = await chunk_queue.get()
+                if item is done:
+                    break
+                if isinstance(item, BaseException):
+                    logger.error("LLM generation failed: %s", item)
+                    raise Exception(f"LLM generation failed: {str(item)}")
+                chunks.append(item)
+                yield item
+        finally:
+            producer.join(timeout=0)
+
+        # Log and cache only once, at completion, to keep per-chunk work at zero
+        response_text = "".join(chunks)
+        logger.info("RESPONSE: %s", response_text)
+
+        if use_cache:
+            llm_cache.set(llm_cache.make_key(prompt, self.model), response_text)
+
     async def generate(self, prompt: str, use_cache: bool = True) -> str:
         """Generate text using the configured LLM."""
-        try:
-            # Log the prompt
-            logger.info(f"PROMPT: {prompt}")
-            
-            # Check cache if enabled
-            if use_cache:
-                # Load cache from disk
-                cache = {}
-                if os.path.exists(cache_file):
-                    try:
-                        with open(cache_file, 'r') as f:
-                            cache = json.load(f)
-                    except:
-                        logger.warning(f"Failed to load cache, starting with empty cache")
-                
-                # Return from cache if exists
-                if prompt in cache:
-                    logger.info(f"CACHE HIT - RESPONSE: {cache[prompt]}")
-                    return cache[prompt]
-
-            # Call the appropriate LLM provider
-            provider = os.getenv("LLM_PROVIDER", "gemini")
-            response_text = ""
-            
-            if provider == "gemini":
-                response = self.client.models.generate_content(
-                    model=self.model,
-                    contents=[prompt]
-                )
-                response_text = response.text
-            elif provider == "anthropic":
-                response = self.client.messages.create(
-                    model=self.model,
-                    max_tokens=21000,
-                    thinking={
-                        "type": "enabled",
-                        "budget_tokens": 20000
-                    },
-                    messages=[
-                        {"role": "user", "content": prompt}
-                    ]
-                )
-                response_text = response.content[1].text
-            elif provider == "openai":
-                response = await self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[{"role": "user", "content": prompt}],
-                    response_format={
-                        "type": "text"
-                    },
-                    reasoning_effort="medium",
-                    store=False,
-                    temperature=0.7,
-                    max_tokens=2000
-                )
-                response_text = response.choices[0].message.content
-            else:
-                raise ValueError(f"Unsupported LLM provider: {provider}")
-
-            # Log the response
-            logger.info(f"RESPONSE: {response_text}")
-            
-            # Update cache if enabled
-            if use_cache:
-                # Load cache again to avoid overwrites
-                cache = {}
-                if os.path.exists(cache_file):
-                    try:
-                        with open(cache_file, 'r') as f:
-                            cache = json.load(f)
-                    except:
-                        pass
-                
-                # Add to cache and save
-                cache[prompt] = response_text
-                try:
-                    with open(cache_file, 'w') as f:
-                        json.dump(cache, f)
-                except Exception as e:
-                    logger.error(f"Failed to save cache: {e}")
+        # Coalesce concurrent callers with the same prompt onto one API call
+        key = llm_cache.make_key(prompt, self.model)
+        fut = self._inflight.get(key)
+        if fut is not None:
+            return await fut
 
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._inflight[key] = fut
+        try:
+            chunks = []
+            async for chunk in self.stream(prompt, use_cache=use_cache):
+                chunks.append(chunk)
+            response_text = "".join(chunks)
+            fut.set_result(response_text)
             return response_text
-
         except Exception as e:
-            logger.error(f"LLM generation failed: {str(e)}")
-            raise Exception(f"LLM generation failed: {str(e)}")
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved in case nobody else is waiting
+            raise
+        finally:
+            # A cancelled leader skips the except block (CancelledError is a
+            # BaseException); cancel the future too, or every coalesced
+            # waiter would hang on it forever
+            if not fut.done():
+                fut.cancel()
+            self._inflight.pop(key, None)
 
     def test_connection(self) -> bool:
         """Test the LLM connection."""
@@ -150,7 +196,7 @@ class LLMService:
             response = self.generate(test_prompt, use_cache=False)
             return True
         except Exception as e:
-            logger.error(f"Connection test failed: {str(e)}")
+            logger.error("Connection test failed: %s", e)
             return False
 
     async def analyze_code(self, code: str, context: str) -> str:
@@ -183,3 +229,8 @@ class LLMService:
         Language: {language}
         """
         return await self.generate(prompt)
+
+@lru_cache(maxsize=1)
+def get_llm_service() -> LLMService:
+    """Shared LLMService instance, so all nodes reuse one client."""
+    return LLMService()
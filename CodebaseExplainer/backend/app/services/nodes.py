@@ -1,13 +1,82 @@
 import asyncio
-import warnings
-import copy
+import hashlib
+import io
+import json
+import logging
+import os
+import random
+import re
+import shutil
+import string
 import time
+import zipfile
+import aiofiles
+from itertools import chain
 from typing import Any, Dict, Optional
-from .github_service import GitHubService
-from .llm_service import LLMService
-from .code_analyzer import CodeAnalyzer
+from .github_service import get_github_service
+from .llm_service import get_llm_service
+from .code_analyzer import get_code_analyzer
+
+log = logging.getLogger(__name__)
+
+class TransientError(Exception):
+    """Raised for failures worth retrying (network hiccups, 429/5xx)."""
+
+# Markers that identify a retryable provider/network failure by message
+_RETRYABLE_MARKERS = ("429", "500", "502", "503", "504", "rate limit", "timeout", "connection", "temporarily")
+
+def _is_transient(exc: Exception) -> bool:
+    """Decide whether an exception is worth retrying at all."""
+    if isinstance(exc, (TransientError, ConnectionError, TimeoutError)):
+        return True
+    if isinstance(exc, (ValueError, TypeError, KeyError)):
+        return False
+    msg = str(exc).lower()
+    return any(marker in msg for marker in _RETRYABLE_MARKERS)
+
+# Per-node checkpoints: a failed run resumes from the last completed stage
+# instead of re-spending every upstream LLM call
+_CHECKPOINT_DIR = os.path.join(".cache", "flow")
+
+def _run_key(shared: Dict[str, Any]) -> Optional[str]:
+    """Stable key for one pipeline run's full configuration."""
+    repo_url = shared.get("repo_url")
+    if not repo_url:
+        return None
+    # Every input that changes the output belongs in the key, otherwise a
+    # rerun with e.g. a different language resumes the wrong checkpoints
+    payload = json.dumps({
+        "repo_url": repo_url,
+        "language": shared.get("language", "english"),
+        "max_file_size": shared.get("max_file_size"),
+        "include_patterns": sorted(shared.get("include_patterns") or []),
+        "exclude_patterns": sorted(shared.get("exclude_patterns") or [])
+    }, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+def _checkpoint_path(shared: Dict[str, Any], node_name: str) -> Optional[str]:
+    key = _run_key(shared)
+    if key is None:
+        return None
+    return os.path.join(_CHECKPOINT_DIR, key, f"{node_name}.json")
+
+def clear_checkpoints(shared: Dict[str, Any]) -> None:
+    """Drop a run's checkpoints; called after the flow completes successfully.
+
+    Checkpoints exist to resume *failed* runs, so keeping them past a
+    successful one would pin every later run of the same config to stale
+    output.
+    """
+    key = _run_key(shared)
+    if key is None:
+        return
+    shutil.rmtree(os.path.join(_CHECKPOINT_DIR, key), ignore_errors=True)
 
 class BaseNode:
+    # Slots avoid a per-instance __dict__; with one instance per pipeline
+    # stage it's a small win, and it turns attribute typos into hard errors
+    __slots__ = ("params", "successors")
+
     def __init__(self):
         self.params = {}
         self.successors = {}
@@ -16,8 +85,10 @@ class BaseNode:
         self.params = params
         
     def next(self, node: 'BaseNode', action: str = "default") -> 'BaseNode':
-        if action in self.successors:
-            warnings.warn(f"Overwriting successor for action '{action}'")
+        # warnings.warn walks the stack and filter list on every call; a
+        # guarded debug log costs one boolean check when debug is off
+        if action in self.successors and log.isEnabledFor(logging.DEBUG):
+            log.debug("Overwriting successor for action '%s'", action)
         self.successors[action] = node
         return node
     
@@ -30,18 +101,66 @@ class BaseNode:
     def post(self, shared: Dict[str, Any], prep_res: Any, exec_res: Any) -> Any:
         pass
     
-    def _exec(self, prep_res: Any) -> Any:
-        return self.exec(prep_res)
-    
-    def _run(self, shared: Dict[str, Any]) -> Any:
+    async def _exec(self, prep_res: Any) -> Any:
+        result = self.exec(prep_res)
+        if asyncio.iscoroutine(result):
+            result = await result
+        return result
+
+    async def _run(self, shared: Dict[str, Any]) -> Any:
+        checkpoint = _checkpoint_path(shared, self.__class__.__name__)
+
+        # Resume from a completed checkpoint unless the caller forces a re-run
+        if checkpoint and not shared.get("force_refresh") and os.path.exists(checkpoint):
+            try:
+                with open(checkpoint, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                shared.update(data.get("shared", {}))
+                print(f"Skipping {self.__class__.__name__}: resumed from checkpoint")
+                # Return the node's original post result so a fully-resumed
+                # flow still hands its caller the final tutorial
+                return data.get("result")
+            except Exception:
+                pass  # unreadable checkpoint: fall through and re-run
+
+        before = dict(shared)
         p = self.prep(shared)
-        e = self._exec(p)
-        return self.post(shared, p, e)
-    
+        e = await self._exec(p)
+        result = self.post(shared, p, e)
+
+        # Persist what this node added to shared so the next run can skip it
+        if checkpoint:
+            delta = {}
+            for k, v in shared.items():
+                if k not in before or before[k] is not v:
+                    try:
+                        json.dumps(v)
+                    except (TypeError, ValueError):
+                        continue
+                    delta[k] = v
+            if delta:
+                # Persist the post result too, when it serializes, so resume
+                # can reproduce this node's return value
+                try:
+                    json.dumps(result)
+                    saved_result = result
+                except (TypeError, ValueError):
+                    saved_result = None
+                try:
+                    os.makedirs(os.path.dirname(checkpoint), exist_ok=True)
+                    tmp = checkpoint + ".tmp"
+                    with open(tmp, 'w', encoding='utf-8') as f:
+                        json.dump({"shared": delta, "result": saved_result}, f)
+                    os.replace(tmp, checkpoint)
+                except Exception as e:
+                    print(f"Failed to write checkpoint for {self.__class__.__name__}: {e}")
+
+        return result
+
     def run(self, shared: Dict[str, Any]) -> Any:
-        if self.successors:
-            warnings.warn("Node won't run successors. Use Flow.")
-        return self._run(shared)
+        if self.successors and log.isEnabledFor(logging.DEBUG):
+            log.debug("Node won't run successors. Use Flow.")
+        return asyncio.run(self._run(shared))
     
     def __rshift__(self, other: 'BaseNode') -> 'BaseNode':
         return self.next(other)
@@ -52,6 +171,8 @@ class BaseNode:
         raise TypeError("Action must be a string")
 
 class _ConditionalTransition:
+    __slots__ = ("src", "action")
+
     def __init__(self, src: BaseNode, action: str):
         self.src = src
         self.action = action
@@ -60,6 +181,8 @@ class _ConditionalTransition:
         return self.src.next(tgt, self.action)
 
 class Node(BaseNode):
+    __slots__ = ("max_retries", "wait", "cur_retry")
+
     def __init__(self, max_retries: int = 1, wait: int = 0):
         super().__init__()
         self.max_retries = max_retries
@@ -68,195 +191,418 @@ class Node(BaseNode):
     
     def exec_fallback(self, prep_res: Any, exc: Exception) -> Any:
         raise exc
-    
-    def _exec(self, prep_res: Any) -> Any:
+
+    async def _exec(self, prep_res: Any) -> Any:
         for self.cur_retry in range(self.max_retries):
             try:
-                return self.exec(prep_res)
+                result = self.exec(prep_res)
+                if asyncio.iscoroutine(result):
+                    result = await result
+                return result
             except Exception as e:
-                if self.cur_retry == self.max_retries - 1:
+                # Don't burn retries on deterministic failures
+                if self.cur_retry == self.max_retries - 1 or not _is_transient(e):
                     return self.exec_fallback(prep_res, e)
-                if self.wait > 0:
-                    time.sleep(self.wait)
+                # Exponential backoff with full jitter keeps retries from stampeding
+                delay = (self.wait or 1) * (2 ** self.cur_retry)
+                await asyncio.sleep(random.uniform(0, delay))
 
 class FetchRepo(Node):
+    __slots__ = ("github_service", "_filter_key", "_include_suffixes", "_exclude_re")
+
     def __init__(self):
         super().__init__(max_retries=3, wait=2)
-        self.github_service = GitHubService()
+        self.github_service = get_github_service()
     
-    def exec(self, prep_res: Any) -> Dict[str, Any]:
+    async def exec(self, prep_res: Any) -> Dict[str, Any]:
         repo_url = self.params.get("repo_url")
         if not repo_url:
             raise ValueError("Repository URL is required")
-            
-        repo_data = self.github_service.fetch_repository(repo_url)
+
+        # The service is synchronous (it drives its own event loop), so run
+        # it in a worker thread to keep this loop free. Passing the filters
+        # down means excluded and oversized files are never downloaded
+        repo_data = await asyncio.to_thread(
+            self.github_service.fetch_repository,
+            repo_url,
+            self.params.get("max_file_size", 100000),
+            set(self.params.get("include_patterns") or []) or None,
+            set(self.params.get("exclude_patterns") or []) or None
+        )
         return {
             "repo_data": repo_data,
             "files": self._filter_files(repo_data["files"]),
             "project_name": repo_data["name"]
         }
+
+    def post(self, shared: Dict[str, Any], prep_res: Any, exec_res: Any) -> Any:
+        shared.update(exec_res)
+        return exec_res
     
     def _filter_files(self, files: list) -> list:
-        include_patterns = self.params.get("include_patterns", [])
-        exclude_patterns = self.params.get("exclude_patterns", [])
+        include_patterns = tuple(self.params.get("include_patterns", []))
+        exclude_patterns = tuple(self.params.get("exclude_patterns", []))
         max_size = self.params.get("max_file_size", 100000)
-        
+
+        # Precompute the matchers once per pattern set: str.endswith takes a
+        # tuple and runs in C, and the exclude prefixes collapse into one
+        # compiled alternation
+        if getattr(self, "_filter_key", None) != (include_patterns, exclude_patterns):
+            self._filter_key = (include_patterns, exclude_patterns)
+            self._include_suffixes = tuple(p.lstrip("*") for p in include_patterns)
+            self._exclude_re = re.compile(
+                "^(?:" + "|".join(re.escape(p.rstrip("/*")) for p in exclude_patterns) + ")"
+            ) if exclude_patterns else None
+
         filtered_files = []
         for file in files:
-            if file["size"] <= max_size:
-                include = False
-                for pattern in include_patterns:
-                    if file["path"].endswith(pattern.lstrip("*")):
-                        include = True
-                        break
-                
-                exclude = False
-                for pattern in exclude_patterns:
-                    if file["path"].startswith(pattern.rstrip("/*")):
-                        exclude = True
-                        break
-                
-                if include and not exclude:
-                    filtered_files.append(file)
-        
+            # No include patterns means include everything
+            if (file["size"] <= max_size
+                    and (not self._include_suffixes or file["path"].endswith(self._include_suffixes))
+                    and not (self._exclude_re and self._exclude_re.match(file["path"]))):
+                filtered_files.append(file)
+
         return filtered_files
 
 class IdentifyAbstractions(Node):
+    __slots__ = ("code_analyzer",)
+
     def __init__(self):
         super().__init__(max_retries=3, wait=2)
-        self.code_analyzer = CodeAnalyzer()
+        self.code_analyzer = get_code_analyzer()
     
-    def exec(self, prep_res: Any) -> Dict[str, Any]:
+    def prep(self, shared: Dict[str, Any]) -> Dict[str, Any]:
+        return {"files": shared.get("files", [])}
+
+    async def exec(self, prep_res: Any) -> Dict[str, Any]:
         files = prep_res["files"]
-        analysis = self.code_analyzer.analyze_files(files)
+        # The analyzer's process-pool fan-out (spawn + map + join) is
+        # synchronous, so run it in a worker thread to keep the loop free
+        analysis = await asyncio.to_thread(self.code_analyzer.analyze_files, files)
         return {
             "abstractions": analysis["abstractions"],
             "relationships": analysis["relationships"],
             "core_components": analysis["core_components"]
         }
 
+    def post(self, shared: Dict[str, Any], prep_res: Any, exec_res: Any) -> Any:
+        abstractions = exec_res["abstractions"]
+
+        # The analyzer emits name-keyed edges; downstream (the Mermaid
+        # diagram, index.md) works with abstraction indices, so resolve the
+        # names here and drop edges to anything outside the analyzed set
+        # (e.g. external base classes)
+        index_of = {}
+        for i, abstraction in enumerate(abstractions):
+            index_of.setdefault(abstraction["name"], i)
+
+        details = []
+        for rel in exec_res["relationships"]:
+            src = index_of.get(rel["from"])
+            dst = index_of.get(rel["to"])
+            if src is None or dst is None:
+                continue
+            details.append({"from": src, "to": dst, "label": rel["label"]})
+
+        relationships = {
+            # Placeholder until AnalyzeRelationships swaps in the LLM summary
+            "summary": f"Static analysis found {len(abstractions)} abstractions "
+                       f"and {len(details)} relationships between them.",
+            "details": details
+        }
+
+        shared["abstractions"] = abstractions
+        shared["relationships"] = relationships
+        shared["core_components"] = exec_res["core_components"]
+        # Serialize once, compactly; every downstream prompt reuses these
+        # strings instead of re-repr'ing the full structures
+        shared["abstractions_json"] = json.dumps(
+            abstractions, separators=(",", ":"), ensure_ascii=False)
+        shared["relationships_json"] = json.dumps(
+            relationships, separators=(",", ":"), ensure_ascii=False)
+        return exec_res
+
 class AnalyzeRelationships(Node):
+    __slots__ = ("llm_service",)
+
     def __init__(self):
         super().__init__(max_retries=3, wait=2)
-        self.llm_service = LLMService()
+        self.llm_service = get_llm_service()
     
-    def exec(self, prep_res: Any) -> Dict[str, Any]:
-        abstractions = prep_res["abstractions"]
-        relationships = prep_res["relationships"]
-        
-        prompt = f"""
-        Analyze these code abstractions and their relationships:
-        {abstractions}
-        
-        Relationships:
-        {relationships}
-        
-        Generate a detailed analysis of how these components interact.
-        Focus on:
-        1. Core data flow
-        2. Component dependencies
-        3. Key patterns and architectural decisions
-        """
-        
-        analysis = self.llm_service.generate(prompt)
+    def prep(self, shared: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "abstractions_json": shared.get("abstractions_json", ""),
+            "relationships_json": shared.get("relationships_json", "")
+        }
+
+    async def exec(self, prep_res: Any) -> Dict[str, Any]:
+        # Stable context first so providers can prefix-cache it; the
+        # task-specific instruction comes last
+        prompt = f"""Code abstractions:
+{prep_res["abstractions_json"]}
+
+Relationships:
+{prep_res["relationships_json"]}
+
+Generate a detailed analysis of how these components interact.
+Focus on:
+1. Core data flow
+2. Component dependencies
+3. Key patterns and architectural decisions
+"""
+
+        analysis = await self.llm_service.generate(prompt)
         return {
             "relationship_analysis": analysis,
             "interaction_patterns": self._extract_patterns(analysis)
         }
-    
+
+    def post(self, shared: Dict[str, Any], prep_res: Any, exec_res: Any) -> Any:
+        shared.update(exec_res)
+        # The LLM analysis becomes the tutorial-facing summary in index.md;
+        # rebuild the dict (rather than mutate) so checkpointing sees it
+        relationships = shared.get("relationships")
+        if isinstance(relationships, dict) and exec_res.get("relationship_analysis"):
+            shared["relationships"] = {
+                **relationships,
+                "summary": exec_res["relationship_analysis"]
+            }
+        return exec_res
+
     def _extract_patterns(self, analysis: str) -> list:
         # Implementation to extract patterns from LLM response
         return []
 
 class OrderChapters(Node):
+    __slots__ = ("llm_service",)
+
     def __init__(self):
         super().__init__(max_retries=3, wait=2)
-        self.llm_service = LLMService()
+        self.llm_service = get_llm_service()
     
-    def exec(self, prep_res: Any) -> Dict[str, Any]:
+    def prep(self, shared: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "relationship_analysis": shared.get("relationship_analysis", ""),
+            "interaction_patterns": shared.get("interaction_patterns", [])
+        }
+
+    async def exec(self, prep_res: Any) -> Dict[str, Any]:
         analysis = prep_res["relationship_analysis"]
         patterns = prep_res["interaction_patterns"]
-        
-        prompt = f"""
-        Create a logical chapter order for this tutorial:
-        {analysis}
-        
-        Key patterns:
-        {patterns}
-        
-        Generate a chapter order that:
-        1. Starts with fundamental concepts
-        2. Builds on previous knowledge
-        3. Maintains logical progression
-        """
-        
-        order = self.llm_service.generate(prompt)
+
+        # Large shared context first, instruction last (prefix-cache friendly)
+        prompt = f"""Tutorial analysis:
+{analysis}
+
+Key patterns:
+{patterns}
+
+Create a logical chapter order for this tutorial that:
+1. Starts with fundamental concepts
+2. Builds on previous knowledge
+3. Maintains logical progression
+"""
+
+        order = await self.llm_service.generate(prompt)
         return {
             "chapter_order": self._parse_order(order)
         }
-    
+
+    def post(self, shared: Dict[str, Any], prep_res: Any, exec_res: Any) -> Any:
+        # Apply the fallback once, where the order is produced, so every
+        # downstream consumer (WriteChapters, CombineTutorial) agrees on it
+        if not exec_res.get("chapter_order"):
+            exec_res["chapter_order"] = list(range(len(shared.get("abstractions", []))))
+        shared.update(exec_res)
+        return exec_res
+
     def _parse_order(self, order: str) -> list:
         # Implementation to parse chapter order from LLM response
         return []
 
-class WriteChapters(Node):
-    def __init__(self):
-        super().__init__(max_retries=3, wait=2)
-        self.llm_service = LLMService()
-    
-    def exec(self, prep_res: Any) -> Dict[str, Any]:
-        order = prep_res["chapter_order"]
-        analysis = prep_res["relationship_analysis"]
-        
-        prompt = f"""
-{language_instruction}Write a very beginner-friendly tutorial chapter (in Markdown format) for the project `{project_name}` about the concept: "{abstraction_name}". This is Chapter {chapter_num}.
-
-Concept Details{concept_details_note}:
-- Name: {abstraction_name}
+# Prompt templates are compiled once at import; Template.substitute is a
+# single C-level pass instead of re-evaluating a large f-string per call
+_INSTRUCTIONS_TMPL = string.Template("""Write a very beginner-friendly tutorial chapter (in Markdown format) for the project `$project_name` for each concept listed below. Generate content in $language unless specified otherwise.
+
+Complete Tutorial Structure:
+$full_chapter_listing
+
+Instructions for every chapter:
+- Start with a clear heading (e.g., `# Chapter 2: <concept name>`). Use the provided concept name.
+- Begin with a high-level motivation explaining what problem this abstraction solves. Start with a central use case as a concrete example and guide the reader to understand how to solve it. Make it very minimal and friendly to beginners.
+- If the abstraction is complex, break it down into key concepts and explain each one-by-one in a very beginner-friendly way.
+- Give example inputs and outputs for code snippets (if the output isn't values, describe at a high level what will happen).
+- Each code block should be BELOW 20 lines! If longer code blocks are needed, break them down into smaller pieces and walk through them one-by-one. Aggresively simplify the code to make it minimal.
+- Describe the internal implementation to help understand what's under the hood, with a simple sequenceDiagram with a dummy example - keep it minimal with at most 5 participants to ensure clarity.
+- When you need to refer to other core abstractions covered in other chapters, ALWAYS use proper Markdown links like this: [Chapter Title](filename.md), using the Complete Tutorial Structure above.
+- Use mermaid diagrams to illustrate complex concepts (```mermaid``` format).
+- Heavily use analogies and examples throughout to help beginners understand.
+- End the chapter with a brief conclusion that summarizes what was learned and provides a transition to the next chapter.""")
+
+_CHAPTER_BLOCK_TMPL = string.Template("""<<<CHAPTER_${num}_START>>>
+This is Chapter $num.
+
+Concept Details:
+- Name: $name
 - Description:
-{abstraction_description}
-
-Complete Tutorial Structure{structure_note}:
-{item["full_chapter_listing"]}
-
-Context from previous chapters{prev_summary_note}:
-{previous_chapters_summary if previous_chapters_summary else "This is the first chapter."}
-
-Relevant Code Snippets (Code itself remains unchanged):
-{file_context_str if file_context_str else "No specific code snippets provided for this abstraction."}
-
-Instructions for the chapter (Generate content in {language.capitalize()} unless specified otherwise):
-- Start with a clear heading (e.g., `# Chapter {chapter_num}: {abstraction_name}`). Use the provided concept name.
+$description
+<<<CHAPTER_${num}_END>>>""")
 
-- If this is not the first chapter, begin with a brief transition from the previous chapter{instruction_lang_note}, referencing it with a proper Markdown link using its name{link_lang_note}.
+_BATCH_PROMPT_TMPL = string.Template("""$instructions
 
-- Begin with a high-level motivation explaining what problem this abstraction solves{instruction_lang_note}. Start with a central use case as a concrete example. The whole chapter should guide the reader to understand how to solve this use case. Make it very minimal and friendly to beginners.
+Write one chapter for each of the $count concept blocks below. In your response, wrap each chapter's Markdown between the same `<<<CHAPTER_<number>_START>>>` and `<<<CHAPTER_<number>_END>>>` markers as its block, with no text outside the markers.
 
-- If the abstraction is complex, break it down into key concepts. Explain each concept one-by-one in a very beginner-friendly way{instruction_lang_note}.
+$blocks""")
 
-- Explain how to use this abstraction to solve the use case{instruction_lang_note}. Give example inputs and outputs for code snippets (if the output isn't values, describe at a high level what will happen{instruction_lang_note}).
+_CHAPTER_PROMPT_TMPL = string.Template("""$instructions
 
-- Each code block should be BELOW 20 lines! If longer code blocks are needed, break them down into smaller pieces and walk through them one-by-one. Aggresively simplify the code to make it minimal. Use comments{code_comment_note} to skip non-important implementation details. Each code block should have a beginner friendly explanation right after it{instruction_lang_note}.
+$chapter_block
 
-- Describe the internal implementation to help understand what's under the hood{instruction_lang_note}. First provide a non-code or code-light walkthrough on what happens step-by-step when the abstraction is called{instruction_lang_note}. It's recommended to use a simple sequenceDiagram with a dummy example - keep it minimal with at most 5 participants to ensure clarity. If participant name has space, use: `participant QP as Query Processing`. {mermaid_lang_note}.
+Now, directly provide a super beginner-friendly Markdown output (DON'T need ```markdown``` tags):
+""")
 
-- Then dive deeper into code for the internal implementation with references to files. Provide example code blocks, but make them similarly simple and beginner-friendly. Explain{instruction_lang_note}.
+class WriteChapters(Node):
+    __slots__ = ("llm_service",)
 
-- IMPORTANT: When you need to refer to other core abstractions covered in other chapters, ALWAYS use proper Markdown links like this: [Chapter Title](filename.md). Use the Complete Tutorial Structure above to find the correct filename and the chapter title{link_lang_note}. Translate the surrounding text.
+    # Batched responses get unreliable past ~16 sections, so larger tutorials
+    # are split into several batched calls instead of one call per chapter
+    MAX_CHAPTERS_PER_CALL = 16
+    # Cap on concurrent LLM calls, for provider rate-limit headroom
+    MAX_CONCURRENCY = 8
 
-- Use mermaid diagrams to illustrate complex concepts (```mermaid``` format). {mermaid_lang_note}.
+    def __init__(self, max_retries: int = 3, wait: int = 2):
+        super().__init__(max_retries=max_retries, wait=wait)
+        self.llm_service = get_llm_service()
 
-- Heavily use analogies and examples throughout{instruction_lang_note} to help beginners understand.
+    def prep(self, shared: Dict[str, Any]) -> Dict[str, Any]:
+        abstractions = shared.get("abstractions", [])
+        chapter_order = shared.get("chapter_order", [])
 
-- End the chapter with a brief conclusion that summarizes what was learned{instruction_lang_note} and provides a transition to the next chapter{instruction_lang_note}. If there is a next chapter
+        chapters = []
+        listing = []
+        for i, abstraction_index in enumerate(chapter_order):
+            if not (0 <= abstraction_index < len(abstractions)):
+                continue
+            abstraction = abstractions[abstraction_index]
+            chapters.append({
+                "num": i + 1,
+                "name": abstraction["name"],
+                "description": abstraction.get("description", "")
+            })
+            listing.append(f"{i + 1}. {abstraction['name']}")
+
+        # The instruction block is identical for every call in this run, so
+        # substitute it once here instead of per batch/chapter
+        instructions = _INSTRUCTIONS_TMPL.substitute(
+            project_name=shared.get("project_name", ""),
+            language=shared.get("language", "english").capitalize(),
+            full_chapter_listing="\n".join(listing)
+        )
 
-Now, directly provide a super beginner-friendly Markdown output (DON'T need ```markdown``` tags):
-"""
+        return {
+            "chapters": chapters,
+            "instructions": instructions
+        }
 
-        chapter_content = call_llm(prompt)
-        # Basic validation/cleanup
-        actual_heading = f"# Chapter {chapter_num}: {abstraction_name}"
-        if not chapter_content.strip().startswith(f"# Chapter {chapter_num}"):
+    async def exec(self, prep_res: Any) -> list:
+        chapters = prep_res["chapters"]
+        if not chapters:
+            return []
+
+        # Chapters only depend on the abstraction descriptions, so the
+        # batched calls are independent and can run concurrently
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENCY)
+
+        async def run_batch(batch):
+            async with semaphore:
+                prompt = self._build_batch_prompt(batch, prep_res)
+                response = await self.llm_service.generate(prompt)
+            parsed = self._parse_batch_response(response, batch)
+            if parsed is None:
+                # Malformed batch output: fall back to one streamed call per chapter
+                parsed = {}
+                for chapter in batch:
+                    async with semaphore:
+                        parsed[chapter["num"]] = await self.stream_chapter(chapter, prep_res)
+            return parsed
+
+        batches = [
+            chapters[start:start + self.MAX_CHAPTERS_PER_CALL]
+            for start in range(0, len(chapters), self.MAX_CHAPTERS_PER_CALL)
+        ]
+        results = {}
+        for parsed in await asyncio.gather(*(run_batch(b) for b in batches)):
+            results.update(parsed)
+
+        return [self._ensure_heading(results[c["num"]], c) for c in chapters]
+
+    def _chapter_block(self, chapter: Dict[str, Any]) -> str:
+        return _CHAPTER_BLOCK_TMPL.substitute(
+            num=chapter["num"],
+            name=chapter["name"],
+            description=chapter["description"]
+        )
+
+    def _build_batch_prompt(self, batch: list, prep_res: Dict[str, Any]) -> str:
+        return _BATCH_PROMPT_TMPL.substitute(
+            instructions=prep_res["instructions"],
+            count=len(batch),
+            blocks="\n\n".join(self._chapter_block(c) for c in batch)
+        )
+
+    def _build_chapter_prompt(self, chapter: Dict[str, Any], prep_res: Dict[str, Any]) -> str:
+        return _CHAPTER_PROMPT_TMPL.substitute(
+            instructions=prep_res["instructions"],
+            chapter_block=self._chapter_block(chapter)
+        )
+
+    async def stream_chapter(self, chapter: Dict[str, Any], prep_res: Dict[str, Any]) -> str:
+        """Generate one chapter via the streaming API, fixing the heading in-flight.
+
+        The heading check runs on the first chunk instead of on the complete
+        text, so other chapters' streams can progress while this one is still
+        being generated.
+        """
+        prompt = self._build_chapter_prompt(chapter, prep_res)
+        buf = io.StringIO()
+        head = ""
+        heading_decided = False
+
+        def flush_head():
+            nonlocal heading_decided
+            if not _CHAPTER_HEADING_RE.match(head.lstrip()):
+                buf.write(f"# Chapter {chapter['num']}: {chapter['name']}\n\n")
+            buf.write(head)
+            heading_decided = True
+
+        async for chunk in self.llm_service.stream(prompt):
+            if heading_decided:
+                buf.write(chunk)
+                continue
+            # Providers happily split the heading across chunks ("# Chap",
+            # "ter 3: ..."), so buffer until the first line is complete (or
+            # clearly longer than any heading) before deciding
+            head += chunk
+            if "\n" in head or len(head.lstrip()) >= 32:
+                flush_head()
+
+        if not heading_decided:
+            flush_head()
+
+        return buf.getvalue().strip()
+
+    def _parse_batch_response(self, response: str, batch: list) -> Optional[Dict[int, str]]:
+        """Split a batched response back into per-chapter Markdown, or None if malformed."""
+        matches = re.findall(r"<<<CHAPTER_(\d+)_START>>>(.*?)<<<CHAPTER_\1_END>>>", response, re.DOTALL)
+        parsed = {int(num): content.strip() for num, content in matches}
+        if set(parsed) != {c["num"] for c in batch}:
+            return None
+        return parsed
+
+    def _ensure_heading(self, chapter_content: str, chapter: Dict[str, Any]) -> str:
+        """Basic validation/cleanup: make sure the chapter starts with its heading."""
+        actual_heading = f"# Chapter {chapter['num']}: {chapter['name']}"
+        if not _CHAPTER_HEADING_RE.match(chapter_content.strip()):
             # Add heading if missing or incorrect, trying to preserve content
             lines = chapter_content.strip().split('\n')
             if lines and lines[0].strip().startswith("#"):
@@ -264,20 +610,35 @@ Now, directly provide a super beginner-friendly Markdown output (DON'T need ```m
                 chapter_content = "\n".join(lines)
             else:  # Otherwise, prepend it
                 chapter_content = f"{actual_heading}\n\n{chapter_content}"
-
-        # Add the generated content to our temporary list for the next iteration's context
-        self.chapters_written_so_far.append(chapter_content)
-
         return chapter_content
 
     def post(self, shared, prep_res, exec_res_list):
         # exec_res_list contains the generated Markdown for each chapter, in order
         shared["chapters"] = exec_res_list
-        # Clean up the temporary instance variable
-        del self.chapters_written_so_far
         print(f"Finished writing {len(exec_res_list)} chapters.")
+        return exec_res_list
+
+# Matches a chapter heading line, compiled once instead of per chapter
+_CHAPTER_HEADING_RE = re.compile(r"^# Chapter \d+")
+# Fixed attribution footer, built once instead of per run (English on purpose)
+_ATTRIBUTION = "\n\n---\n\nGenerated by [AI Codebase Knowledge Builder](https://github.com/The-Pocket/Tutorial-Codebase-Knowledge)"
+# Characters not allowed in chapter filenames, replaced in one C-level sub.
+# \W is Unicode-aware, matching what the old per-char isalnum check kept, so
+# translated (non-Latin) names survive; underscore already mapped to itself
+_SAFE_NAME_RE = re.compile(r'\W')
+# Strips quotes and folds newlines for Mermaid labels in a single translate pass
+_MERMAID_ESCAPE = str.maketrans({'"': '', '\n': ' '})
+
+def _truncate(label: str, max_len: int = 30) -> str:
+    """Clip long Mermaid edge labels, keeping short ones untouched."""
+    return label[:max_len - 3] + "..." if len(label) > max_len else label
 
 class CombineTutorial(Node):
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__()
+
     def prep(self, shared):
         project_name = shared["project_name"]
         output_base_dir = shared.get("output_dir", "output")
@@ -291,41 +652,35 @@ class CombineTutorial(Node):
         chapters_content = shared["chapters"]
 
         # --- Generate Mermaid Diagram ---
-        mermaid_lines = ["flowchart TD"]
-        # Add nodes for each abstraction using potentially translated names
-        for i, abstr in enumerate(abstractions):
-            node_id = f"A{i}"
-            # Use potentially translated name, sanitize for Mermaid ID and label
-            sanitized_name = abstr['name'].replace('"', '')
-            node_label = sanitized_name  # Using sanitized name only
-            mermaid_lines.append(f'    {node_id}["{node_label}"]')  # Node label uses potentially translated name
-        # Add edges for relationships using potentially translated labels
-        for rel in relationships_data['details']:
-            from_node_id = f"A{rel['from']}"
-            to_node_id = f"A{rel['to']}"
-            # Use potentially translated label, sanitize
-            edge_label = rel['label'].replace('"', '').replace('\n', ' ')  # Basic sanitization
-            max_label_len = 30
-            if len(edge_label) > max_label_len:
-                edge_label = edge_label[:max_label_len-3] + "..."
-            mermaid_lines.append(f'    {from_node_id} -- "{edge_label}" --> {to_node_id}')  # Edge label uses potentially translated label
-
-        mermaid_diagram = "\n".join(mermaid_lines)
+        # Node and edge lines (names/labels potentially translated) come from
+        # generator expressions fed straight into join: no intermediate list,
+        # no per-iteration append
+        nodes = (
+            f'    A{i}["{abstr["name"].translate(_MERMAID_ESCAPE)}"]'
+            for i, abstr in enumerate(abstractions)
+        )
+        edges = (
+            f'    A{rel["from"]} -- "{_truncate(rel["label"].translate(_MERMAID_ESCAPE))}" --> A{rel["to"]}'
+            for rel in relationships_data['details']
+        )
+        mermaid_diagram = "\n".join(chain(["flowchart TD"], nodes, edges))
         # --- End Mermaid ---
 
         # --- Prepare index.md content ---
-        index_content = f"# Tutorial: {project_name}\n\n"
-        index_content += f"{relationships_data['summary']}\n\n"  # Use the potentially translated summary directly
-        # Keep fixed strings in English
-        index_content += f"**Source Repository:** [{repo_url}]({repo_url})\n\n"
-
-        # Add Mermaid diagram for relationships (diagram itself uses potentially translated names/labels)
-        index_content += "```mermaid\n"
-        index_content += mermaid_diagram + "\n"
-        index_content += "````\n\n"
-
-        # Keep fixed strings in English
-        index_content += f"## Chapters\n\n"
+        # Accumulate parts in a list and join once at the end, instead of
+        # repeated += on an ever-growing string
+        index_parts = [
+            f"# Tutorial: {project_name}\n\n",
+            f"{relationships_data['summary']}\n\n",  # Use the potentially translated summary directly
+            # Keep fixed strings in English
+            f"**Source Repository:** [{repo_url}]({repo_url})\n\n",
+            # Mermaid diagram for relationships (diagram itself uses potentially translated names/labels)
+            "```mermaid\n",
+            mermaid_diagram + "\n",
+            "````\n\n",
+            # Keep fixed strings in English
+            "## Chapters\n\n",
+        ]
 
         chapter_files = []
         # Generate chapter links based on the determined order, using potentially translated names
@@ -334,72 +689,88 @@ class CombineTutorial(Node):
             if 0 <= abstraction_index < len(abstractions) and i < len(chapters_content):
                 abstraction_name = abstractions[abstraction_index]["name"]  # Potentially translated name
                 # Sanitize potentially translated name for filename
-                safe_name = "".join(c if c.isalnum() else '_' for c in abstraction_name).lower()
+                safe_name = _SAFE_NAME_RE.sub('_', abstraction_name).lower()
                 filename = f"{i+1:02d}_{safe_name}.md"
-                index_content += f"{i+1}. [{abstraction_name}]({filename})\n"  # Use potentially translated name in link text
+                index_parts.append(f"{i+1}. [{abstraction_name}]({filename})\n")  # Use potentially translated name in link text
 
                 # Add attribution to chapter content (using English fixed string)
-                chapter_content = chapters_content[i]  # Potentially translated content
-                if not chapter_content.endswith("\n\n"):
-                    chapter_content += "\n\n"
-                # Keep fixed strings in English
-                chapter_content += f"---\n\nGenerated by [AI Codebase Knowledge Builder](https://github.com/The-Pocket/Tutorial-Codebase-Knowledge)"
+                chapter_content = chapters_content[i].rstrip("\n")  # Potentially translated content
 
                 # Store filename and corresponding content
-                chapter_files.append({"filename": filename, "content": chapter_content})
+                chapter_files.append({"filename": filename, "content": chapter_content + _ATTRIBUTION})
             else:
                  print(f"Warning: Mismatch between chapter order, abstractions, or content at index {i} (abstraction index {abstraction_index}). Skipping file generation for this entry.")
 
         # Add attribution to index content (using English fixed string)
-        index_content += f"\n\n---\n\nGenerated by [AI Codebase Knowledge Builder](https://github.com/The-Pocket/Tutorial-Codebase-Knowledge)"
+        index_parts.append(_ATTRIBUTION)
+        index_content = "".join(index_parts)
 
         return {
             "output_path": output_path,
             "index_content": index_content,
-            "chapter_files": chapter_files  # List of {"filename": str, "content": str}
+            "chapter_files": chapter_files,  # List of {"filename": str, "content": str}
+            "zip_output": shared.get("output_format") == "zip"
         }
 
-    def exec(self, prep_res):
+    async def exec(self, prep_res):
         output_path = prep_res["output_path"]
         index_content = prep_res["index_content"]
         chapter_files = prep_res["chapter_files"]
 
+        if prep_res["zip_output"]:
+            # One archive instead of N small files: a single syscall sequence
+            # and one uploadable artifact, and deflate shrinks markdown a lot
+            archive_path = output_path + ".zip"
+            print(f"Combining tutorial into archive: {archive_path}")
+
+            def _write_zip():
+                os.makedirs(os.path.dirname(archive_path) or ".", exist_ok=True)
+                with zipfile.ZipFile(archive_path, "w",
+                                     compression=zipfile.ZIP_DEFLATED,
+                                     compresslevel=6) as zf:
+                    zf.writestr("index.md", index_content)
+                    for chapter in chapter_files:
+                        zf.writestr(chapter["filename"], chapter["content"])
+
+            # zipfile is synchronous, so keep the event loop free while it runs
+            await asyncio.to_thread(_write_zip)
+            return archive_path
+
         print(f"Combining tutorial into directory: {output_path}")
         # Rely on Node's built-in retry/fallback
         os.makedirs(output_path, exist_ok=True)
 
-        # Write index.md
-        index_filepath = os.path.join(output_path, "index.md")
-        with open(index_filepath, "w", encoding="utf-8") as f:
-            f.write(index_content)
-        print(f"  - Wrote {index_filepath}")
-
-        # Write chapter files
-        for chapter_info in chapter_files:
-            chapter_filepath = os.path.join(output_path, chapter_info["filename"])
-            with open(chapter_filepath, "w", encoding="utf-8") as f:
-                f.write(chapter_info["content"])
-            print(f"  - Wrote {chapter_filepath}")
+        writes = [("index.md", index_content)]
+        writes += [(c["filename"], c["content"]) for c in chapter_files]
+
+        async def _awrite(filename, content):
+            filepath = os.path.join(output_path, filename)
+            data = content.encode('utf-8')
+            # Skip byte-identical content on re-runs (cached LLM responses
+            # make unchanged chapters the common case); compare against the
+            # file itself so no sidecar state pollutes the tutorial directory
+            if os.path.exists(filepath):
+                async with aiofiles.open(filepath, "rb") as f:
+                    if await f.read() == data:
+                        print(f"  - Unchanged {filepath}")
+                        return
+            async with aiofiles.open(filepath, "wb") as f:
+                await f.write(data)
+            print(f"  - Wrote {filepath}")
+
+        # All files are independent, so write them concurrently
+        await asyncio.gather(*[_awrite(filename, content) for filename, content in writes])
 
         return output_path  # Return the final path
 
     def post(self, shared, prep_res, exec_res):
         shared["final_output_dir"] = exec_res  # Store the output path
-        print(f"\nTutorial generation complete! Files are in: {exec_res}")
-
-class CombineTutorial(Node):
-    def __init__(self):
-        super().__init__()
-    
-    def exec(self, prep_res: Any) -> Dict[str, Any]:
-        chapters = prep_res["chapters"]
-        project_name = self.params.get("project_name")
-        
-        tutorial = {
-            "title": f"{project_name} Tutorial",
-            "chapters": chapters,
+        shared["tutorial"] = {
+            "title": f"{shared.get('project_name', '')} Tutorial",
+            "chapters": shared.get("chapters", []),
             "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "language": self.params.get("language", "english")
+            "language": shared.get("language", "english"),
+            "output_dir": exec_res
         }
-        
-        return tutorial
+        print(f"\nTutorial generation complete! Files are in: {exec_res}")
+        return shared["tutorial"]
@@ -6,21 +6,39 @@ from .nodes import (
     WriteChapters,
     CombineTutorial
 )
+from ..flow import Flow
 from typing import Dict, Any
-import copy
+import time
 
 class TutorialGenerator:
-    def __init__(self):
-        # Create the workflow
-        self.flow = FetchRepo() >> IdentifyAbstractions() >> AnalyzeRelationships() >> OrderChapters() >> WriteChapters() >> CombineTutorial()
+    def _build_flow(self) -> Flow:
+        """Create a fresh workflow for one run.
 
-    def generate(
+        Flow.run mutates its shared_data and hands it to every node via
+        set_params, so concurrent generate() calls must not share a Flow
+        (or node instances) — the heavy services behind the nodes are
+        singletons already, so per-run construction is cheap.
+        """
+        fetch_repo = FetchRepo()
+        identify_abstractions = IdentifyAbstractions()
+        analyze_relationships = AnalyzeRelationships()
+        order_chapters = OrderChapters()
+        write_chapters = WriteChapters()
+        combine_tutorial = CombineTutorial()
+
+        fetch_repo >> identify_abstractions >> analyze_relationships >> order_chapters >> write_chapters >> combine_tutorial
+
+        return Flow(start=fetch_repo)
+
+    async def generate(
         self,
         repo_url: str,
         language: str = "english",
         include_patterns: list = None,
         exclude_patterns: list = None,
-        max_file_size: int = 100000
+        max_file_size: int = 100000,
+        force_refresh: bool = False,
+        output_format: str = "files"
     ) -> Dict[str, Any]:
         """Generate a complete tutorial for a codebase using the node-based workflow."""
         try:
@@ -39,11 +57,13 @@ class TutorialGenerator:
                     "legacy/*", ".git/*", ".github/*", ".next/*", ".vscode/*",
                     "obj/*", "bin/*", "node_modules/*", "*.log"
                 ],
-                "max_file_size": max_file_size
+                "max_file_size": max_file_size,
+                "force_refresh": force_refresh,
+                "output_format": output_format
             }
 
-            # Run the workflow
-            result = self.flow.run(shared)
+            # Run the workflow on its own flow, isolated from other runs
+            result = await self._build_flow().run(shared)
 
             return {
                 "status": "success",
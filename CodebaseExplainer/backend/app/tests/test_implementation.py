@@ -1,8 +1,12 @@
 import os
 import json
 import difflib
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from typing import Dict, List, Any
 from pathlib import Path
+from rapidfuzz import fuzz
 
 # Import both implementations
 import sys
@@ -19,8 +23,16 @@ def similar_content(str1: str, str2: str, threshold: float = 0.9) -> bool:
     """
     Check if two strings are similar enough based on similarity ratio.
     """
-    seq = difflib.SequenceMatcher(None, str1, str2)
-    return seq.ratio() >= threshold
+    # rapidfuzz's bit-parallel Levenshtein is orders of magnitude faster than
+    # SequenceMatcher on chapter-sized texts
+    return fuzz.ratio(str1, str2) / 100.0 >= threshold
+
+def _read_text(path: Path) -> str:
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def _hash_file(path: Path) -> bytes:
+    return hashlib.blake2b(path.read_bytes(), digest_size=16).digest()
 
 def compare_files_in_directories(dir1: str, dir2: str) -> None:
     """
@@ -34,27 +46,38 @@ def compare_files_in_directories(dir1: str, dir2: str) -> None:
         f"Directory structures differ: {len(dir1_files)} vs {len(dir2_files)} files"
     
     # Compare each file
+    file_pairs = []
     for file1, file2 in zip(sorted(dir1_files), sorted(dir2_files)):
         assert file1.name == file2.name, f"File name mismatch: {file1.name} vs {file2.name}"
-        
         if file1.is_file() and file2.is_file():
-            with open(file1, 'r', encoding='utf-8') as f1, \
-                 open(file2, 'r', encoding='utf-8') as f2:
-                content1 = f1.read()
-                content2 = f2.read()
-                
-                # Compare file contents
-                if not similar_content(content1, content2):
-                    print(f"\nContent mismatch in {file1.name}")
-                    print("\nDifferences:")
-                    for line in difflib.unified_diff(
-                        content1.splitlines(),
-                        content2.splitlines(),
-                        fromfile=str(file1),
-                        tofile=str(file2)
-                    ):
-                        print(line)
-                    raise AssertionError(f"Content mismatch in {file1.name}")
+            file_pairs.append((file1, file2))
+
+    # Hashing is I/O bound, so digest both sides with a thread pool; equal
+    # digests prove identical content without any similarity or diff work
+    with ThreadPoolExecutor() as executor:
+        hashes1 = list(executor.map(_hash_file, (p[0] for p in file_pairs)))
+        hashes2 = list(executor.map(_hash_file, (p[1] for p in file_pairs)))
+
+    for (file1, file2), hash1, hash2 in zip(file_pairs, hashes1, hashes2):
+        if hash1 == hash2:
+            continue
+
+        # Only mismatched files are read into memory and compared
+        content1 = _read_text(file1)
+        content2 = _read_text(file2)
+        if not similar_content(content1, content2):
+            print(f"\nContent mismatch in {file1.name}")
+            print("\nDifferences:")
+            diff = difflib.unified_diff(
+                content1.splitlines(),
+                content2.splitlines(),
+                fromfile=str(file1),
+                tofile=str(file2)
+            )
+            # Cap diff output so a hugely divergent file doesn't stall teardown
+            for line in islice(diff, 200):
+                print(line)
+            raise AssertionError(f"Content mismatch in {file1.name}")
 
 def compare_implementations(repo_url: str, config: Dict[str, Any]) -> None:
     """